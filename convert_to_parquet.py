@@ -0,0 +1,15 @@
+"""One-time build step: convert the season CSVs into Snappy-compressed Parquet.
+
+Run after publishing a new CSV:  python convert_to_parquet.py
+"""
+from pathlib import Path
+
+import pandas as pd
+
+CSV_FILES = ["defensive_metrics_25.csv", "defensive_metrics_24.csv"]
+
+for csv_path in CSV_FILES:
+    out_path = Path(csv_path).with_suffix(".parquet")
+    df = pd.read_csv(csv_path, engine="pyarrow", dtype_backend="pyarrow")
+    df.to_parquet(out_path, compression="snappy", index=False)
+    print(f"{csv_path} -> {out_path} ({len(df)} rows)")
@@ -1,6 +1,10 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import altair as alt
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 
 # ---------- Page setup ----------
 st.set_page_config(page_title="MLB Defensive Profiles", layout="wide")
@@ -40,140 +44,242 @@ LABEL = {
     "FRV": "FRV",
     "FRV_percentile": "FRV (pct)",
 }
+# Parquet files are built from the CSVs by convert_to_parquet.py
 DATA_FILES = {
-    "2025": "defensive_metrics_25.csv",
-    "2024": "defensive_metrics_24.csv",
+    "2025": "defensive_metrics_25.parquet",
+    "2024": "defensive_metrics_24.parquet",
 }
+# Only these columns are read from disk (Parquet column pruning)
+NEEDED_COLUMNS = ["Player", "Team", "Inn", "Age", *RAW_METRICS, *PCT_METRICS]
 
 # ---------- Sidebar: season + filters ----------
 with st.sidebar:
     st.header("Controls")
     season = st.radio("Season", options=list(DATA_FILES.keys()), index=0, horizontal=True)
 
-@st.cache_data
-def load_df(csv_path: str) -> pd.DataFrame:
-    df = pd.read_csv(csv_path)
+def compute_percentiles(df: pd.DataFrame, metrics: list[str]) -> np.ndarray:
+    # Average ranks over finite values (ties share a percentile); the rest stay NaN
+    A = df[metrics].to_numpy(dtype=np.float32, na_value=np.nan)
+    pct = np.full(A.shape, np.nan, dtype=np.float32)
+    for j in range(A.shape[1]):
+        valid = np.isfinite(A[:, j])
+        vals = A[valid, j]
+        s = np.sort(vals)
+        ranks = (np.searchsorted(s, vals, "left") + np.searchsorted(s, vals, "right") - 1) / 2
+        pct[valid, j] = 100.0 * ranks / max(len(s) - 1, 1)
+    return pct
+
+# Persisted to disk so restarts skip re-parsing; the cache key is the file path,
+# so publish a new season file under a new name
+@st.cache_data(persist="disk", show_spinner="Loading season…")
+def load_df(path: str) -> pd.DataFrame:
+    # Read only the needed columns; keep them Arrow-backed
+    available = set(pq.read_schema(path).names)
+    columns = [c for c in NEEDED_COLUMNS if c in available]
+    df = pq.read_table(path, columns=columns).to_pandas(types_mapper=pd.ArrowDtype)
+    # Shipped percentiles are global; only fill in any the file is missing
+    missing = [m for m in RAW_METRICS if m in df.columns and f"{m}_percentile" not in df.columns]
+    if missing:
+        df[[f"{m}_percentile" for m in missing]] = compute_percentiles(df, missing)
+    # float32 is plenty for these metrics and halves the bytes scanned
+    metric_cols = [c for c in RAW_METRICS + PCT_METRICS if c in df.columns]
+    df[metric_cols] = df[metric_cols].astype("float32[pyarrow]")
+    # Categorical codes make team/player filters and uniques integer work
+    df["Team"] = df["Team"].astype("category")
+    df["Player"] = df["Player"].astype("category")
     # Disagreement Index = std dev across percentile columns (NaNs are ignored row-wise)
     existing_pct = [c for c in PCT_METRICS if c in df.columns]
-    df["disagreement_index"] = df[existing_pct].std(axis=1, ddof=0)
+    arr = df[existing_pct].to_numpy(dtype=np.float64, na_value=np.nan)
+    df["disagreement_index"] = np.nanstd(arr, axis=1, ddof=0)
     return df
 
-df = load_df(DATA_FILES[season])
+@st.cache_resource
+def all_seasons() -> dict[str, pd.DataFrame]:
+    # Both seasons stay loaded and shared across sessions (treat as read-only)
+    return {k: load_df(v) for k, v in DATA_FILES.items()}
+
+@st.cache_data
+def teams(season: str) -> list[str]:
+    # Every category is observed at ingest, so the categories are the unique teams
+    return sorted(all_seasons()[season]["Team"].cat.categories.tolist())
+
+@st.cache_data
+def players_by_team(season: str) -> dict[str, list[str]]:
+    # Sorted player lists per team (plus "(All)"), built in one groupby pass
+    df = all_seasons()[season]
+    lists = {
+        t: sorted(g["Player"].unique().tolist())
+        for t, g in df.groupby("Team", observed=True, sort=False)
+    }
+    lists["(All)"] = sorted(df["Player"].unique().tolist())
+    return lists
+
+@st.cache_data
+def row_positions(season: str) -> dict[tuple[str, str], int]:
+    # (team, player) -> row position; "(All)" maps to the player's first row
+    df = all_seasons()[season]
+    positions = {}
+    for i, (t, p) in enumerate(zip(df["Team"], df["Player"])):
+        positions.setdefault((t, p), i)
+        positions.setdefault(("(All)", p), i)
+    return positions
+
+@st.cache_resource
+def arrow_table(season: str) -> pa.Table:
+    # Arrow view of the season for the leaderboard's Arrow compute path; the
+    # Arrow-backed columns are shared with the pandas frame, not copied
+    df = all_seasons()[season]
+    tbl = pa.Table.from_pandas(df, preserve_index=False)
+    # File order, used to break ties the same way nlargest(keep="first") did
+    return tbl.append_column("row_order", pa.array(np.arange(len(df))))
+
+@st.cache_data
+def leaderboard(season: str, lb_team: str, sort_metric: str, top_n: int) -> pd.DataFrame:
+    tbl = arrow_table(season)
+    if lb_team != "(All)":
+        tbl = tbl.filter(pc.equal(tbl["Team"], lb_team))
+    # Remove players with no data for the chosen metric
+    tbl = tbl.filter(pc.is_valid(tbl[sort_metric]))
+    # Native partial sort: only the top N rows are ordered; ties go by file order
+    idx = pc.select_k_unstable(
+        tbl, k=top_n, sort_keys=[(sort_metric, "descending"), ("row_order", "ascending")]
+    )
+    return tbl.take(idx).select(["Player", "Team", sort_metric, "disagreement_index"]).to_pandas()
+
+@st.cache_data
+def build_chart(labels: tuple[str, ...], values: tuple[float, ...]) -> dict:
+    # Compiled Vega-Lite spec, so a cache hit skips Altair entirely. No VegaFusion
+    # transformer: it only emits Vega (not Vega-Lite) specs, and st.vega_lite_chart
+    # already moves the spec's datasets out of the JSON into Arrow.
+    chart_df = pd.DataFrame({
+        "Metric": np.array(labels, dtype=object),
+        "Percentile": np.array(values, dtype=np.float64),
+    })
+    # Altair bar chart with rotated, black x-labels
+    chart = (
+        alt.Chart(chart_df)
+        .mark_bar()
+        .encode(
+            x=alt.X("Metric:N", sort=None,
+                    axis=alt.Axis(labelAngle=45, labelColor="black", title=None)),
+            y=alt.Y("Percentile:Q", scale=alt.Scale(domain=[0, 100]),
+                    title="Percentile (0–100)"),
+            tooltip=["Metric:N", alt.Tooltip("Percentile:Q", format=".2f")],
+        )
+        .properties(height=320)
+    )
+    return chart.to_dict()
+
+df = all_seasons()[season]
 
 with st.sidebar:
-    team = st.selectbox("Filter players by team", ["(All)"] + sorted(df["Team"].unique().tolist()))
-    candidates = df if team == "(All)" else df[df["Team"] == team]
-    player = st.selectbox("Player", sorted(candidates["Player"].astype(str).unique()))
+    team = st.selectbox("Filter players by team", ["(All)"] + teams(season))
+    player = st.selectbox("Player", players_by_team(season)[team])
 
-# Selected player row (use candidates to respect team filter)
-row = candidates[candidates["Player"] == player].iloc[0]
+# Selected player row (keyed by team filter so it matches the selectbox)
+row = df.iloc[row_positions(season)[(team, player)]]
 
 # For this player: which percentile metrics actually have data?
-player_pct_cols = [m for m in PCT_METRICS if m in df.columns and pd.notna(row[m])]
+existing_pct = [m for m in PCT_METRICS if m in df.columns]
+pct_row = row[existing_pct].to_numpy(dtype=np.float64, na_value=np.nan)
+has_pct = np.isfinite(pct_row)
+player_pct_cols = [existing_pct[i] for i in np.flatnonzero(has_pct)]
+present_vals = pct_row[has_pct]
 
 # ---------- Profile ----------
-left, right = st.columns([2, 3], gap="large")
-
-with left:
-    st.subheader(f"{row['Player']} · {row['Team']} · {season}")
-    st.markdown(f"Innings: **{int(row['Inn'])}** &nbsp;|&nbsp; Age: **{row['Age']}**")
-    st.markdown(f"Disagreement Index: **{row['disagreement_index']:.2f}**")
-
-    # Story Splitter (clean UI, skip NaN metrics)
-    if player_pct_cols:
-        best = max(player_pct_cols, key=lambda m: row[m])
-        worst = min(player_pct_cols, key=lambda m: row[m])
-        bcol, wcol = st.columns(2)
-        with bcol:
-            st.success(
-                f"**Best metric**\n\n{LABEL[best]} — **{row[best]:.0f}th**",
-                icon="✅",
-            )
-        with wcol:
-            st.warning(
-                f"**Least favorable**\n\n{LABEL[worst]} — **{row[worst]:.0f}th**",
-                icon="⚠️",
-            )
-    else:
-        st.info("No percentile data available for this player.")
-
-with right:
-    st.subheader("Global Percentiles")
-    if player_pct_cols:
-        chart_df = pd.DataFrame({
-            "Metric": [LABEL[m] for m in player_pct_cols],
-            "Percentile": [row[m] for m in player_pct_cols],
-        })
-        # Altair bar chart with rotated, black x-labels
-        chart = (
-            alt.Chart(chart_df)
-            .mark_bar()
-            .encode(
-                x=alt.X("Metric:N", sort=None,
-                        axis=alt.Axis(labelAngle=45, labelColor="black", title=None)),
-                y=alt.Y("Percentile:Q", scale=alt.Scale(domain=[0, 100]),
-                        title="Percentile (0–100)"),
-                tooltip=["Metric:N", "Percentile:Q"],
+def profile_section(
+    season: str, row: pd.Series, player_pct_cols: list[str], pct_vals: np.ndarray
+) -> None:
+    left, right = st.columns([2, 3], gap="large")
+
+    with left:
+        st.subheader(f"{row['Player']} · {row['Team']} · {season}")
+        st.markdown(f"Innings: **{int(row['Inn'])}** &nbsp;|&nbsp; Age: **{row['Age']}**")
+        st.markdown(f"Disagreement Index: **{row['disagreement_index']:.2f}**")
+
+        # Story Splitter (clean UI, skip NaN metrics)
+        if player_pct_cols:
+            bi, wi = int(np.nanargmax(pct_vals)), int(np.nanargmin(pct_vals))
+            best, worst = player_pct_cols[bi], player_pct_cols[wi]
+            bcol, wcol = st.columns(2)
+            with bcol:
+                st.success(
+                    f"**Best metric**\n\n{LABEL[best]} — **{pct_vals[bi]:.0f}th**",
+                    icon="✅",
+                )
+            with wcol:
+                st.warning(
+                    f"**Least favorable**\n\n{LABEL[worst]} — **{pct_vals[wi]:.0f}th**",
+                    icon="⚠️",
+                )
+        else:
+            st.info("No percentile data available for this player.")
+
+    with right:
+        st.subheader("Global Percentiles")
+        if player_pct_cols:
+            spec = build_chart(
+                tuple(LABEL[m] for m in player_pct_cols), tuple(pct_vals.tolist())
             )
-            .properties(height=320)
-        )
-        st.altair_chart(chart, use_container_width=True)
-    else:
-        st.write("No percentile metrics to display for this player.")
+            st.vega_lite_chart(spec, use_container_width=True)
+        else:
+            st.write("No percentile metrics to display for this player.")
+
+profile_section(season, row, player_pct_cols, present_vals)
 
 st.divider()
 
-# ---------- Raw vs Percentiles table (consistent horizontal align) ----------
+# ---------- Raw vs Percentiles table ----------
 st.subheader("Raw vs Percentiles")
 table = pd.DataFrame({
     "Metric": [LABEL[m] for m in RAW_METRICS],
-    "Raw":    [row[m] for m in RAW_METRICS],
-    "Percentile (0–100)": [row[p] for p in PCT_METRICS],
+    "Raw":    row[RAW_METRICS].to_numpy(dtype=np.float64, na_value=np.nan),
+    "Percentile (0–100)": row[PCT_METRICS].to_numpy(dtype=np.float64, na_value=np.nan),
 })
-# Use Styler + st.table for consistent alignment and N/A for missing
-styler = (
-    table.style
-    .set_properties(**{"text-align": "center"})
-    .set_table_styles([{"selector": "th", "props": [("text-align", "center")]}])
-    .format(precision=2, subset=["Raw"], na_rep="N/A")
-    .format(precision=0, subset=["Percentile (0–100)"], na_rep="N/A")
+# st.dataframe ships the frame as Arrow; number formatting happens client-side
+st.dataframe(
+    table,
+    use_container_width=True,
+    hide_index=True,
+    column_config={
+        "Raw": st.column_config.NumberColumn(format="%.2f"),
+        "Percentile (0–100)": st.column_config.NumberColumn(format="%.0f"),
+    },
 )
-st.table(styler)
 
 st.divider()
 
 # ---------- Leaderboard (with its own team filter) ----------
-st.subheader(f"Leaderboards — {season}")
-lc1, lc2, lc3 = st.columns([2, 1, 1])
-with lc1:
-    sort_metric = st.selectbox(
-        "Sort by percentile metric",
-        options=PCT_METRICS,
-        format_func=lambda c: LABEL[c],
+# Fragment: the leaderboard widgets only rerun this section
+@st.fragment
+def leaderboard_section(season: str) -> None:
+    st.subheader(f"Leaderboards — {season}")
+    lc1, lc2, lc3 = st.columns([2, 1, 1])
+    with lc1:
+        sort_metric = st.selectbox(
+            "Sort by percentile metric",
+            options=PCT_METRICS,
+            format_func=lambda c: LABEL[c],
+        )
+    with lc2:
+        lb_team = st.selectbox("Team filter (leaderboard)", ["(All)"] + teams(season))
+    with lc3:
+        top_n = st.number_input("Top N", min_value=5, max_value=100, value=20, step=5)
+
+    leader = leaderboard(season, lb_team, sort_metric, int(top_n)).rename(
+        columns={sort_metric: LABEL[sort_metric]}
     )
-with lc2:
-    lb_team = st.selectbox("Team filter (leaderboard)", ["(All)"] + sorted(df["Team"].unique().tolist()))
-with lc3:
-    top_n = st.number_input("Top N", min_value=5, max_value=100, value=20, step=5)
-
-lb_pool = df if lb_team == "(All)" else df[df["Team"] == lb_team]
-# Remove players with no data for the chosen metric
-lb_pool = lb_pool[lb_pool[sort_metric].notna()]
-
-leader = (
-    lb_pool.sort_values(sort_metric, ascending=False)
-    [["Player", "Team", sort_metric, "disagreement_index"]]
-    .head(int(top_n))
-    .rename(columns={sort_metric: LABEL[sort_metric]})
-)
-leader_styler = (
-    leader.style
-    .set_properties(**{"text-align": "center"})
-    .set_table_styles([{"selector": "th", "props": [("text-align", "center")]}])
-    .format(precision=0, subset=[LABEL[sort_metric]])
-    .format(precision=2, subset=["disagreement_index"])
-)
-st.table(leader_styler)
+    st.dataframe(
+        leader,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            LABEL[sort_metric]: st.column_config.NumberColumn(format="%.0f"),
+            "disagreement_index": st.column_config.NumberColumn(format="%.2f"),
+        },
+    )
+
+leaderboard_section(season)
 
 st.divider()
 